@@ -26,6 +26,7 @@ REG_APPROVAL_REQUIRED = 2104
 REG_REJECTION_REASON_REQUIRED = 2105
 REG_ALREADY_OWNED = 2106
 REG_CHILD_ALREADY_OWNED = 2107
+REG_SUBMIT_IN_PROGRESS = 2108
 
 PAY_INIT_FAILED = 2200
 PAY_VERIFY_FAILED = 2201
@@ -0,0 +1,54 @@
+import os
+import threading
+from typing import Iterable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class PooledSession:
+    """
+    Lazily created requests.Session with a pooled, retrying adapter; calling the instance returns it.
+    The session is re-created after a fork so worker processes never share sockets.
+    """
+
+    def __init__(
+        self,
+        *,
+        retries: int,
+        backoff_factor: float,
+        allowed_methods: Iterable[str],
+        pool_connections: int,
+        pool_maxsize: int,
+        status_forcelist: Iterable[int] = (502, 503, 504),
+        schemes: Iterable[str] = ("https://",),
+    ):
+        self._retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=tuple(status_forcelist),
+            allowed_methods=frozenset(allowed_methods),
+        )
+        self._pool_connections = pool_connections
+        self._pool_maxsize = pool_maxsize
+        self._schemes = tuple(schemes)
+        self._session: Optional[requests.Session] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def __call__(self) -> requests.Session:
+        pid = os.getpid()
+        if self._session is None or self._pid != pid:
+            with self._lock:
+                if self._session is None or self._pid != pid:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=self._pool_connections,
+                        pool_maxsize=self._pool_maxsize,
+                        max_retries=self._retry,
+                    )
+                    for scheme in self._schemes:
+                        session.mount(scheme, adapter)
+                    self._session, self._pid = session, pid
+        return self._session
@@ -1,6 +1,22 @@
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 
 class EmailProvider(ABC):
     @abstractmethod
     def send(self, *, to: str, subject: str, html: str, text: str | None = None) -> None:
-        ...
\ No newline at end of file
+        ...
+
+    def send_many(self, *, to_list: list[str], subject: str, html: str, text: str | None = None) -> dict[str, str]:
+        """Send identical content to each address; returns {address: error} for failures."""
+        errors = {}
+        for to in to_list:
+            try:
+                self.send(to=to, subject=subject, html=html, text=text)
+            except Exception as e:
+                errors[to] = str(e)
+        return errors
+
+    @contextmanager
+    def session(self):
+        """Scope for several send_many calls that may share one connection; a no-op by default."""
+        yield self
@@ -1,9 +1,12 @@
 import smtplib
+from contextlib import contextmanager
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from django.conf import settings
 from .base import EmailProvider
 
+_TO_PLACEHOLDER = "recipient@placeholder.invalid"
+
 class SmtpEmailProvider(EmailProvider):
     def __init__(self):
         self.host = settings.EMAIL_HOST
@@ -12,27 +15,90 @@ class SmtpEmailProvider(EmailProvider):
         self.password = settings.EMAIL_HOST_PASSWORD
         self.use_tls = settings.EMAIL_USE_TLS
         self.from_addr = settings.EMAIL_DEFAULT_FROM
+        self._server: smtplib.SMTP | None = None
+        self._in_session = False
 
-    def send(self, *, to: str, subject: str, html: str, text: str | None = None) -> None:
-        msg = MIMEMultipart("alternative")
+    def _build_message(self, *, to: str, subject: str, html: str, text: str | None):
+        if html:
+            msg = MIMEMultipart("alternative")
+            if text:
+                msg.attach(MIMEText(text, "plain", _charset="utf-8"))
+            msg.attach(MIMEText(html, "html", _charset="utf-8"))
+        else:
+            # text-only: no need for multipart/alternative framing
+            msg = MIMEText(text or "", "plain", _charset="utf-8")
         msg["Subject"] = subject
         msg["From"] = self.from_addr
         msg["To"] = to
+        return msg
 
-        if text:
-            msg.attach(MIMEText(text, "plain", _charset="utf-8"))
-        msg.attach(MIMEText(html, "html", _charset="utf-8"))
-
-        print(self.host, self.port, self.user, self.password, self.use_tls, self.from_addr)
-
+    def _connect(self) -> smtplib.SMTP:
         server = smtplib.SMTP(self.host, self.port, timeout=20)
         try:
             if self.use_tls:
                 server.starttls()
             server.login(self.user, self.password)
+        except Exception:
+            self._close(server)
+            raise
+        return server
+
+    @staticmethod
+    def _close(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+    def send(self, *, to: str, subject: str, html: str, text: str | None = None) -> None:
+        msg = self._build_message(to=to, subject=subject, html=html, text=text)
+
+        server = self._connect()
+        try:
             server.sendmail(self.from_addr, [to], msg.as_string())
         finally:
+            self._close(server)
+
+    @contextmanager
+    def session(self):
+        """One SMTP connection for every send_many call inside the block, opened on first use."""
+        self._in_session = True
+        try:
+            yield self
+        finally:
+            if self._server is not None:
+                self._close(self._server)
+            self._server = None
+            self._in_session = False
+
+    def _session_sendmail(self, to: str, data) -> None:
+        if self._server is None:
+            self._server = self._connect()
+        try:
+            self._server.sendmail(self.from_addr, [to], data)
+        except smtplib.SMTPServerDisconnected:
+            # the server dropped the connection mid-batch: reconnect once and resend
+            self._server = self._connect()
+            self._server.sendmail(self.from_addr, [to], data)
+
+    def send_many(self, *, to_list: list[str], subject: str, html: str, text: str | None = None) -> dict[str, str]:
+        if not self._in_session:
+            with self.session():
+                return self.send_many(to_list=to_list, subject=subject, html=html, text=text)
+
+        # serialize the MIME message once; only the To: header differs per recipient
+        msg = self._build_message(to=_TO_PLACEHOLDER, subject=subject, html=html, text=text)
+        body = msg.as_bytes()
+        placeholder = b"To: " + _TO_PLACEHOLDER.encode()
+
+        errors = {}
+        for to in to_list:
             try:
-                server.quit()
-            except Exception:
-                pass
\ No newline at end of file
+                if to.isascii():
+                    data = body.replace(placeholder, b"To: " + to.encode(), 1)
+                else:
+                    data = self._build_message(to=to, subject=subject, html=html, text=text).as_string()
+                self._session_sendmail(to, data)
+            except Exception as e:
+                errors[to] = str(e)
+        return errors
@@ -1,11 +1,77 @@
+import re
 from django.template import Template, Context
 from django.utils import timezone
+from django.utils.html import conditional_escape
 from django.db import transaction
 from .models import EmailTemplate, Notification, BulkJob, BulkRecipient
 from .providers import get_email_provider
 
+# Templates specialized into str.format_map strings, compiled lazily on first use in each process.
+# code -> (updated_at, (subject_fmt, html_fmt, text_fmt | None) or None when the engine is needed)
+FAST_TEMPLATES: dict = {}
+
+_VAR_RE = re.compile(r"{{\s*([A-Za-z_][A-Za-z0-9_]*)\s*}}")
+
+
+class _EscapedContext(dict):
+    """Mirrors Django's rendering: values are autoescaped and missing keys render as ''."""
+
+    def __init__(self, ctx: dict):
+        super().__init__((k, conditional_escape(v)) for k, v in ctx.items())
+
+    def __missing__(self, key):
+        return ""
+
+
+def _to_format_string(source: str) -> str | None:
+    """Convert a template made only of plain `{{ var }}` tags into a format string, else None."""
+    parts = []
+    pos = 0
+    for m in _VAR_RE.finditer(source):
+        parts.append((source[pos:m.start()], m.group(1)))
+        pos = m.end()
+    parts.append((source[pos:], None))
+    # block tags, comments, filters and dotted lookups need the real engine
+    if any(tag in literal for literal, _ in parts for tag in ("{{", "{%", "{#")):
+        return None
+    return "".join(
+        literal.replace("{", "{{").replace("}", "}}") + ("{" + name + "}" if name else "")
+        for literal, name in parts
+    )
+
+
+def compile_fast_template(template: EmailTemplate) -> tuple[str, str, str | None] | None:
+    subject = _to_format_string(template.subject)
+    html = _to_format_string(template.html)
+    text = _to_format_string(template.text) if template.text else None
+    if subject is None or html is None or (template.text and text is None):
+        return None
+    return subject, html, text
+
+
+def get_fast_template(template: EmailTemplate) -> tuple[str, str, str | None] | None:
+    """The compiled form of `template`, recompiled whenever its updated_at changes."""
+    cached = FAST_TEMPLATES.get(template.code)
+    if cached is None or cached[0] != template.updated_at:
+        cached = (template.updated_at, compile_fast_template(template))
+        FAST_TEMPLATES[template.code] = cached
+    return cached[1]
+
+
+def render_fast(compiled: tuple[str, str, str | None], ctx: dict) -> tuple[str, str, str | None]:
+    subject_fmt, html_fmt, text_fmt = compiled
+    values = _EscapedContext(ctx)
+    return (
+        subject_fmt.format_map(values),
+        html_fmt.format_map(values),
+        text_fmt.format_map(values) if text_fmt is not None else None,
+    )
+
 
 def render_email(template: EmailTemplate, ctx: dict) -> tuple[str, str, str | None]:
+    compiled = get_fast_template(template)
+    if compiled is not None:
+        return render_fast(compiled, ctx)
     subject = Template(template.subject).render(Context(ctx))
     html = Template(template.html).render(Context(ctx))
     text = Template(template.text).render(Context(ctx)) if template.text else None
@@ -16,7 +82,21 @@ def queue_single_email(*, to: str, template_code: str, context: dict, subject_ov
     tpl = EmailTemplate.objects.get(code=template_code)
     n = Notification.objects.create(channel="email", to=to, template=tpl, context=context, subject_override=subject_override or "")
     from .tasks import send_notification_task
-    send_notification_task.delay(n.id)
+
+    def _enqueue():
+        # rendered after commit so callers' transactions (and row locks) don't wait on it
+        try:
+            subject, html, text = render_email(tpl, context)
+        except Exception:
+            # let the worker render from the row; it records failures and retries
+            send_notification_task.delay(n.id)
+            return
+        if subject_override:
+            subject = subject_override
+        send_notification_task.delay(n.id, to, subject, html, text)
+
+    # the task no longer re-reads the row, so only enqueue once it is committed
+    transaction.on_commit(_enqueue)
     return n
 
 @transaction.atomic
@@ -27,7 +107,7 @@ def create_bulk_job(*, template_code: str, recipients: list[dict], job_type: str
         BulkRecipient(job=job, to=item["to"], context=item.get("context", {})) for item in recipients
     ])
     from .tasks import dispatch_bulk_job
-    dispatch_bulk_job.delay(job.id)
+    transaction.on_commit(lambda: dispatch_bulk_job.delay(job.id))
     return job
 
 def send_otp(destination: str, code: str, channel: str = "email") -> None:
@@ -45,6 +125,15 @@ def send_status_change_email(to: str, *, status_code: str, extra: dict | None =
     ctx = {"status": status_code, **(extra or {})}
     queue_single_email(to=to, template_code="status_change", context=ctx)
 
+def send_status_change_emails(items: list[tuple[str, str, dict | None]]) -> BulkJob | None:
+    """Queue (to, status_code, extra) status emails as one bulk job instead of a task per email."""
+    if not items:
+        return None
+    return create_bulk_job(
+        template_code="status_change",
+        recipients=[{"to": to, "context": {"status": code, **(extra or {})}} for to, code, extra in items],
+    )
+
 def send_email_with_custom_template(to: str, template: str, status_code: str, extra: dict | None = None) -> None:
     ctx = {"status": status_code, **(extra or {})}
     queue_single_email(to=to, template_code=template, context=ctx)
\ No newline at end of file
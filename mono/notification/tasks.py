@@ -1,37 +1,42 @@
-from celery import shared_task
+from celery import group, shared_task
 from celery.exceptions import Retry
 from django.conf import settings
-from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
 from .models import Notification, BulkJob, BulkRecipient
-from .services import render_email
+from .services import get_fast_template, render_email, render_fast
 from .providers import get_email_provider
 
 RATE = settings.NOTIF_EMAIL_RATE
 MAX_RETRY = settings.NOTIF_BULK_RETRY_MAX
 BACKOFF = settings.NOTIF_BULK_RETRY_BACKOFF
 CHUNK = settings.NOTIF_BULK_CHUNK_SIZE
+ERROR_MAX_LEN = 2000
+
+def _trim(s: str, n: int = ERROR_MAX_LEN) -> str:
+    return s if len(s) <= n else s[:n] + "...[truncated]"
 
 @shared_task(bind=True, rate_limit=RATE, autoretry_for=(Exception,), retry_backoff=True, retry_backoff_max=600, retry_jitter=True, max_retries=MAX_RETRY)
-def send_notification_task(self, notification_id: int):
-    n = Notification.objects.select_related("template").get(id=notification_id)
-    if n.status == "sent":
+def send_notification_task(self, notification_id: int, to: str | None = None, subject: str | None = None,
+                           html: str | None = None, text: str | None = None):
+    if to is None:
+        # message queued without pre-rendered content: load and render it here
+        n = Notification.objects.select_related("template").get(id=notification_id)
+        if n.status == "sent":
+            return
+        to = n.to
+        subject, html, text = render_email(n.template, n.context)
+        if n.subject_override:
+            subject = n.subject_override
+    elif self.request.retries and Notification.objects.filter(id=notification_id, status="sent").exists():
         return
     provider = get_email_provider()
-    subject, html, text = render_email(n.template, n.context)
-    if n.subject_override:
-        subject = n.subject_override
     try:
-        provider.send(to=n.to, subject=subject, html=html, text=text)
-        n.status = "sent"
-        n.sent_at = timezone.now()
-        n.error = ""
+        provider.send(to=to, subject=subject, html=html, text=text)
     except Exception as e:
-        n.status = "failed"
-        n.error = str(e)
+        Notification.objects.filter(id=notification_id).update(status="failed", error=_trim(str(e)))
         raise  # let Celery retry
-    finally:
-        n.save(update_fields=["status", "sent_at", "error"])
+    Notification.objects.filter(id=notification_id).update(status="sent", sent_at=timezone.now(), error="")
 
 @shared_task(bind=True)
 def dispatch_bulk_job(self, job_id: int):
@@ -42,14 +47,19 @@ def dispatch_bulk_job(self, job_id: int):
 
     # Chunk recipients to avoid huge fan-out and memory
     qs = job.recipients.filter(state="queued").values_list("id", flat=True)
+    batches = []
     batch = []
     for rid in qs.iterator(chunk_size=1000):
         batch.append(rid)
         if len(batch) >= CHUNK:
-            process_bulk_chunk.delay(job.id, batch)
+            batches.append(batch)
             batch = []
     if batch:
-        process_bulk_chunk.delay(job.id, batch)
+        batches.append(batch)
+
+    # publish all chunks in one go instead of one broker round-trip per chunk
+    if batches:
+        group(process_bulk_chunk.s(job.id, b) for b in batches).apply_async()
 
 @shared_task(bind=True, rate_limit=RATE, autoretry_for=(Exception,), retry_backoff=True, retry_jitter=True, max_retries=MAX_RETRY)
 def process_bulk_chunk(self, job_id: int, recipient_ids: list[int]):
@@ -60,27 +70,44 @@ def process_bulk_chunk(self, job_id: int, recipient_ids: list[int]):
     ok = 0
     fail = 0
 
-    for rid in recipient_ids:
-        br = BulkRecipient.objects.get(id=rid)
+    rows = list(BulkRecipient.objects.filter(id__in=recipient_ids).only("id", "to", "context"))
+    compiled = get_fast_template(template)
+
+    # recipients whose rendered content is identical share one serialized message
+    groups: dict[tuple, list[BulkRecipient]] = {}
+    for br in rows:
         try:
-            subject, html, text = render_email(template, br.context)
-            provider.send(to=br.to, subject=subject, html=html, text=text)
-            br.state = "sent"
-            br.error = ""
-            ok += 1
+            if compiled is not None:
+                rendered = render_fast(compiled, br.context)
+            else:
+                rendered = render_email(template, br.context)
         except Exception as e:
             br.state = "failed"
-            br.error = str(e)
+            br.error = _trim(str(e))
             fail += 1
-        br.save(update_fields=["state", "error"])
+            continue
+        groups.setdefault(rendered, []).append(br)
+
+    # one connection for the whole chunk, shared by every rendered group
+    with provider.session():
+        for (subject, html, text), members in groups.items():
+            try:
+                errors = provider.send_many(to_list=[br.to for br in members], subject=subject, html=html, text=text)
+            except Exception as e:
+                errors = {br.to: str(e) for br in members}
+            for br in members:
+                if br.to in errors:
+                    br.state = "failed"
+                    br.error = _trim(errors[br.to])
+                    fail += 1
+                else:
+                    br.state = "sent"
+                    br.error = ""
+                    ok += 1
+    BulkRecipient.objects.bulk_update(rows, ["state", "error"])
 
-    # update aggregates atomically
-    with transaction.atomic():
-        job.sent = job.sent + ok
-        job.failed = job.failed + fail
-        # mark done if no queued left
-        remaining = job.recipients.filter(state="queued").exists()
-        if not remaining:
-            job.status = "done"
-            job.finished_at = timezone.now()
-        job.save(update_fields=["sent", "failed", "status", "finished_at"])
\ No newline at end of file
+    # update aggregates atomically; the job is done once every recipient is accounted for
+    BulkJob.objects.filter(id=job_id).update(sent=F("sent") + ok, failed=F("failed") + fail)
+    job = BulkJob.objects.only("sent", "failed", "total", "status").get(id=job_id)
+    if job.sent + job.failed >= job.total:
+        BulkJob.objects.filter(id=job_id).exclude(status="done").update(status="done", finished_at=timezone.now())
@@ -7,13 +7,9 @@ def on_payment_success(payment: Payment):
         from competitions.models import TeamRequest
         from competitions.services import mark_payment_final
         tr = TeamRequest.objects.get(id=payment.target_id)
-        mark_payment_final(tr)
-    elif payment.target_type == Payment.TargetType.COURSE:
-        from presentations.models import Registration
-        from presentations.services import set_status_final
-        ids = [int(s) for s in payment.target_id.split(",") if s.strip()]
-        regs_qs = Registration.objects.filter(id__in=ids)
-        set_status_final(list(regs_qs))
+        if tr.status != TeamRequest.Status.FINAL:
+            mark_payment_final(tr)
+    # COURSE payments are finalized by payment.tasks._finalize_registration, matched on the payer
 
 def on_payment_failure(payment: Payment):
     # TODO: Fix this
@@ -21,4 +17,5 @@ def on_payment_failure(payment: Payment):
         from competitions.models import TeamRequest
         from competitions.services import mark_payment_rejected
         tr = TeamRequest.objects.get(id=payment.target_id)
-        mark_payment_rejected(tr)
+        if tr.status != TeamRequest.Status.PAYMENT_REJECTED:
+            mark_payment_rejected(tr)
@@ -4,6 +4,9 @@ from .models import Payment
 class VerifySerializer(serializers.Serializer):
     authority = serializers.CharField()
 
+class VerifyBatchSerializer(serializers.Serializer):
+    authorities = serializers.ListField(child=serializers.CharField(), allow_empty=False, max_length=20)
+
 class PaymentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Payment
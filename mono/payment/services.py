@@ -2,25 +2,59 @@
 
 from __future__ import annotations
 
+import orjson
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Optional, List, Dict, Any
 from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 from acm.exceptions import CustomAPIException
+from acm.http_utils import PooledSession
 from acm import error_codes as EC
 
 from .models import Payment
-from .domain_hooks import on_payment_success, on_payment_failure
 
 User = get_user_model()
 
 # ---- Zarinpal endpoints ----
 Z_BASE = "https://payment.zarinpal.com/pg/v4/payment"
+STARTPAY_BASE = "https://payment.zarinpal.com/pg/StartPay"
+_REQ_URL = Z_BASE + "/request.json"
+_VERIFY_URL = Z_BASE + "/verify.json"
+_UNVERIFIED_URL = Z_BASE + "/unVerified.json"
 HEADERS = {"accept": "application/json", "content-type": "application/json"}
 
+# The unVerified list is merchant-wide, so one short-lived copy is shared by all workers.
+UNVERIFIED_CACHE_KEY = "zarinpal:unverified:authorities"
+UNVERIFIED_CACHE_TTL = 30  # seconds
+
+# Successful verify responses, so a repeated /verify/ (reload, double submit) skips the gateway.
+VERIFIED_CACHE_TTL = 300  # seconds
+
+VERIFY_MAX_WORKERS = 8
+
+# (connect, read) timeouts for gateway calls
+TIMEOUT = (3.05, 20)
+
+# Gateway codes for a verified payment; 101 is what a repeated verify of the same authority returns.
+VERIFIED_CODES = (100, 101)
+
+# One pooled session for the single Zarinpal origin, so TLS connections are reused across calls.
+# Only the unVerified GET is retried after a read error or 5xx: request.json and verify.json are not
+# idempotent, so POSTs are only retried when the connection could not be opened at all.
+_http = PooledSession(
+    retries=2,
+    backoff_factor=0.2,
+    allowed_methods=["GET"],
+    pool_connections=4,
+    pool_maxsize=20,
+)
+
 
 @dataclass
 class StartPayResult:
@@ -30,6 +64,14 @@ class StartPayResult:
 
 
 # ---- Helpers ----
+def _loads(r: requests.Response) -> dict:
+    try:
+        return orjson.loads(r.content)
+    except orjson.JSONDecodeError as e:
+        # keep the requests.RequestException contract callers already handle
+        raise requests.exceptions.InvalidJSONError(str(e), response=r)
+
+
 def _callback_url() -> str:
     """
     Backend callback URL that Zarinpal will redirect the user to.
@@ -38,49 +80,151 @@ def _callback_url() -> str:
     return settings.PAYMENT_CALLBACK_BASE
 
 
-def _unverified_list() -> List[Dict]:
+def _unverified_list(expected: set[str] | None = None) -> set[str]:
     """
-    Fetch the list of unverified authorities from Zarinpal.
-    Returns [] on non-100 or network error.
+    Fetch the authorities Zarinpal still has unverified (cached for UNVERIFIED_CACHE_TTL seconds).
+    A cached set missing any of `expected` may predate a payment that was just made, so it is
+    refetched instead of trusted.
+    Only the authority strings are kept; returns an empty set on non-100 or network error (not cached).
     """
-    url = f"{Z_BASE}/unVerified.json"
+    cached = cache.get(UNVERIFIED_CACHE_KEY)
+    if cached is not None and (expected is None or expected <= cached):
+        return cached
     try:
-        r = requests.get(url, headers={"accept": "application/json"}, timeout=15)
+        r = _http().get(_UNVERIFIED_URL, headers={"accept": "application/json"}, timeout=TIMEOUT)
         r.raise_for_status()
-        data = r.json().get("data", {}) or {}
+        data = _loads(r).get("data", {}) or {}
         if str(data.get("code")) != "100":
-            return []
-        return data.get("authorities", []) or []
+            return set()
+        authorities = {a for item in data.get("authorities", []) or [] if (a := item.get("authority"))}
     except requests.RequestException:
-        return []
+        return set()
+    cache.set(UNVERIFIED_CACHE_KEY, authorities, timeout=UNVERIFIED_CACHE_TTL)
+    return authorities
+
+
+def _forget_unverified(authorities: set[str]) -> None:
+    """Drop authorities we just verified from the cached unVerified set."""
+    if not authorities:
+        return
+    cached = cache.get(UNVERIFIED_CACHE_KEY)
+    if cached is None:
+        return
+    if cached & authorities:
+        cache.set(UNVERIFIED_CACHE_KEY, cached - authorities, timeout=UNVERIFIED_CACHE_TTL)
 
 
 def _request_payment(
     *, merchant_id: str, amount: int, description: str, email: str, mobile: Optional[str] = None
 ) -> dict:
-    url = f"{Z_BASE}/request.json"
+    metadata = {"email": email}
+    if mobile:
+        metadata["mobile"] = mobile
     payload = {
         "merchant_id": merchant_id,
         "amount": amount,
         "callback_url": _callback_url(),
         "description": description or "ACM purchase",
-        "metadata": {"email": email, **({"mobile": mobile} if mobile else {})},
+        "metadata": metadata,
     }
-    r = requests.post(url, json=payload, headers=HEADERS, timeout=20)
+    r = _http().post(_REQ_URL, data=orjson.dumps(payload), headers=HEADERS, timeout=TIMEOUT)
     r.raise_for_status()
-    return r.json()
+    return _loads(r)
 
 
 def _verify_payment(*, merchant_id: str, amount: int, authority: str) -> dict:
-    url = f"{Z_BASE}/verify.json"
     payload = {"merchant_id": merchant_id, "amount": amount, "authority": authority}
-    r = requests.post(url, json=payload, headers=HEADERS, timeout=20)
+    r = _http().post(_VERIFY_URL, data=orjson.dumps(payload), headers=HEADERS, timeout=TIMEOUT)
     r.raise_for_status()
-    return r.json()
+    return _loads(r)
+
+
+def _verified_key(authority: str) -> str:
+    return f"zp:verified:{authority}"
+
+
+def _verify_payment_cached(*, merchant_id: str, amount: int, authority: str) -> dict:
+    """
+    _verify_payment with successful results remembered per authority for VERIFIED_CACHE_TTL seconds.
+    Zarinpal answers a second verify of the same authority with 101, so this also keeps the original data.
+    """
+    cached = cache.get(_verified_key(authority))
+    if cached is not None:
+        return {"data": cached}
+    res = _verify_payment(merchant_id=merchant_id, amount=amount, authority=authority)
+    d = res.get("data", {}) or {}
+    if d.get("code") == 100:
+        cache.set(
+            _verified_key(authority),
+            {
+                "code": 100,
+                "message": d.get("message", ""),
+                "ref_id": d.get("ref_id", ""),
+                "card_pan": d.get("card_pan", ""),
+                "card_hash": d.get("card_hash", ""),
+            },
+            timeout=VERIFIED_CACHE_TTL,
+        )
+    return res
+
+
+def _verify_many(
+    *, merchant_id: str, payments: List[Payment], return_exceptions: bool = False
+) -> List[tuple[Payment, dict | requests.RequestException]]:
+    """
+    Verify several authorities against Zarinpal concurrently (the calls are independent and I/O-bound).
+    Returns (payment, response) pairs in input order. Gateway/network errors propagate unless
+    return_exceptions is set, in which case the exception takes the response's place.
+    """
+    def verify(p: Payment):
+        try:
+            return _verify_payment_cached(merchant_id=merchant_id, amount=p.amount, authority=p.authority)
+        except requests.RequestException as e:
+            if not return_exceptions:
+                raise
+            return e
+
+    if not payments:
+        return []
+    if len(payments) == 1:
+        return [(payments[0], verify(payments[0]))]
+    with ThreadPoolExecutor(max_workers=min(VERIFY_MAX_WORKERS, len(payments))) as ex:
+        results = list(ex.map(verify, payments))
+    return list(zip(payments, results))
+
+
+ZARINPAL_MESSAGE_MAX_LEN = Payment._meta.get_field("zarinpal_message").max_length
+
+
+def _trim_message(s: str, n: int = ZARINPAL_MESSAGE_MAX_LEN) -> str:
+    # network errors (e.g. "Max retries exceeded ... Caused by ...") easily overflow the column
+    return s if len(s) <= n else s[: n - 14] + "...[truncated]"
+
+
+VERIFY_RESULT_FIELDS = ["status", "zarinpal_code", "zarinpal_message", "ref_id", "card_pan", "card_hash", "updated_at"]
+
+
+def _apply_verify_result(p: Payment, res: dict | requests.RequestException) -> None:
+    """Copy a verify.json response (or the network error) onto the payment; caller persists VERIFY_RESULT_FIELDS."""
+    if isinstance(res, requests.RequestException):
+        p.status = Payment.Status.FAILED
+        p.zarinpal_message = _trim_message(str(res))
+        return
+    d = res.get("data", {}) or {}
+    code = d.get("code")
+    p.zarinpal_code = str(code)
+    p.zarinpal_message = _trim_message(d.get("message", "") or "")
+    if code in VERIFIED_CODES:
+        p.status = Payment.Status.SUCCESSFUL
+        # a 101 answer may omit the card details; never blank out what is already stored
+        p.ref_id = str(d.get("ref_id") or p.ref_id or "")
+        p.card_pan = str(d.get("card_pan") or p.card_pan or "")
+        p.card_hash = str(d.get("card_hash") or p.card_hash or "")
+    else:
+        p.status = Payment.Status.FAILED
 
 
 # ---- Public API ----
-@transaction.atomic
 def initiate_payment_for_target(
     *,
     user: User,
@@ -105,6 +249,8 @@ def initiate_payment_for_target(
             status_code=401,
         )
 
+    target_id = str(target_id)  # callers may pass an int id; compare/store as the CharField value
+
     merchant = settings.ZARINPAL_MERCHANT_ID
     if not merchant:
         raise CustomAPIException(
@@ -113,33 +259,52 @@ def initiate_payment_for_target(
             status_code=400,
         )
 
-    # Step 1: verify any outstanding PENDING payments present in unVerified list
-    pending = list(Payment.objects.select_for_update().filter(user=user, status=Payment.Status.PENDING))
-    if pending:
-        authorities_map = {item.get("authority"): item for item in _unverified_list()}
-        for p in pending:
-            if p.authority and p.authority in authorities_map:
-                v = _verify_payment(merchant_id=merchant, amount=p.amount, authority=p.authority)
-                d = v.get("data", {}) or {}
-                code = d.get("code")
-                p.zarinpal_code = str(code)
-                p.zarinpal_message = d.get("message", "") or ""
-                if code == 100:
-                    p.status = Payment.Status.SUCCESSFUL
-                    p.ref_id = str(d.get("ref_id", "") or "")
-                    p.card_pan = str(d.get("card_pan", "") or "")
-                    p.card_hash = str(d.get("card_hash", "") or "")
-                    p.save()
+    # Step 1: verify any outstanding PENDING payments present in unVerified list.
+    # Gateway calls run outside any transaction; row locks are only taken to write the results.
+    pending = list(
+        Payment.objects.filter(user=user, status=Payment.Status.PENDING)
+        .only("id", "authority", "amount", "target_type", "target_id")
+    )
+    pending_auths = {p.authority for p in pending if p.authority}
+    if pending_auths:
+        # the user may have just paid one of these; a stale cached set must not hide it
+        intersect = pending_auths & _unverified_list(expected=pending_auths)
+        to_verify = [p for p in pending if p.authority in intersect]
+        results = _verify_many(merchant_id=merchant, payments=to_verify)
+
+        conflict = False
+        verified = set()
+        to_update = []
+        now = timezone.now()
+        with transaction.atomic():
+            locked = {
+                p.pk: p
+                for p in Payment.objects.select_for_update(of=("self",), skip_locked=True)
+                .filter(pk__in=[p.pk for p, _ in results], status=Payment.Status.PENDING)
+                .only("id", "authority", "target_type", "target_id", "ref_id", "card_pan", "card_hash")
+            }
+            for snapshot, v in results:
+                p = locked.get(snapshot.pk)
+                if p is None:
+                    continue  # settled (or being settled) by a concurrent request
+                _apply_verify_result(p, v)
+                p.updated_at = now
+                if p.status == Payment.Status.SUCCESSFUL:
+                    verified.add(p.authority)
                     # conflict if same purchase already paid
-                    if p.target_type == target_type and str(p.target_id) == str(target_id):
-                        raise CustomAPIException(
-                            code=EC.PAY_EXISTING_SUCCESS,
-                            message="Existing successful payment found for this purchase",
-                            status_code=409,
-                        )
-                else:
-                    p.status = Payment.Status.FAILED
-                    p.save()
+                    if p.target_type == target_type and p.target_id == target_id:
+                        conflict = True
+                to_update.append(p)
+            # one CASE WHEN statement for all results instead of an UPDATE per payment
+            Payment.objects.bulk_update(to_update, fields=VERIFY_RESULT_FIELDS, batch_size=100)
+
+        _forget_unverified(verified)
+        if conflict:
+            raise CustomAPIException(
+                code=EC.PAY_EXISTING_SUCCESS,
+                message="Existing successful payment found for this purchase",
+                status_code=409,
+            )
 
     # Step 2: request payment
     try:
@@ -154,10 +319,10 @@ def initiate_payment_for_target(
         Payment.objects.create(
             user=user,
             target_type=target_type,
-            target_id=str(target_id),
+            target_id=target_id,
             amount=amount,
             status=Payment.Status.PG_INITIATE_ERROR,
-            zarinpal_message=str(e),
+            zarinpal_message=_trim_message(str(e)),
             description=description or "",
             metadata={"stage": "request", "exc": str(e), **(extra_metadata or {})},
         )
@@ -173,11 +338,11 @@ def initiate_payment_for_target(
         Payment.objects.create(
             user=user,
             target_type=target_type,
-            target_id=str(target_id),
+            target_id=target_id,
             amount=amount,
             status=Payment.Status.PG_INITIATE_ERROR,
             zarinpal_code=str(code),
-            zarinpal_message=d.get("message", "") or "",
+            zarinpal_message=_trim_message(d.get("message", "") or ""),
             description=description or "",
             metadata={"stage": "request", "resp": d, **(extra_metadata or {})},
         )
@@ -191,14 +356,14 @@ def initiate_payment_for_target(
     pay = Payment.objects.create(
         user=user,
         target_type=target_type,
-        target_id=str(target_id),   # store as string
+        target_id=target_id,
         amount=amount,
         status=Payment.Status.PENDING,
         authority=authority,
         description=description or "",
         metadata={"fee_type": d.get("fee_type"), "fee": d.get("fee"), **(extra_metadata or {})},
     )
-    startpay_url = f"https://payment.zarinpal.com/pg/StartPay/{authority}"
+    startpay_url = f"{STARTPAY_BASE}/{authority}"
     return StartPayResult(url=startpay_url, payment=pay, authority=authority)
 
 
@@ -206,9 +371,9 @@ def initiate_payment_for_target(
 def verify_by_authority(*, user: User, authority: str) -> Payment:
     """
     Verify a payment by authority for the given user (frontend passes authority after redirect).
-    On success/failure, updates Payment and triggers domain hooks.
+    On success/failure, updates Payment and enqueues the domain hooks (finalize_payment task).
 
-    If metadata includes 'reg_id', finalize that registration (parent+children) immediately.
+    If metadata includes 'reg_id', that task also finalizes the registration (parent+children).
     """
     if not user or not user.is_authenticated:
         raise CustomAPIException(
@@ -233,53 +398,77 @@ def verify_by_authority(*, user: User, authority: str) -> Payment:
     merchant = settings.ZARINPAL_MERCHANT_ID
 
     try:
-        res = _verify_payment(merchant_id=merchant, amount=p.amount, authority=authority)
+        res = _verify_payment_cached(merchant_id=merchant, amount=p.amount, authority=authority)
     except requests.RequestException as e:
-        p.status = Payment.Status.FAILED
-        p.zarinpal_message = str(e)
-        p.save(update_fields=["status", "zarinpal_message"])
-        on_payment_failure(p)
-        return p
+        res = e
 
-    d = res.get("data", {}) or {}
-    code = d.get("code")
-    p.zarinpal_code = str(code)
-    p.zarinpal_message = d.get("message", "") or ""
+    _apply_verify_result(p, res)
+    p.save(update_fields=VERIFY_RESULT_FIELDS)
+    _enqueue_finalize(p)
+    return p
 
-    if code == 100:
-        p.status = Payment.Status.SUCCESSFUL
-        p.ref_id = str(d.get("ref_id", "") or "")
-        p.card_pan = str(d.get("card_pan", "") or "")
-        p.card_hash = str(d.get("card_hash", "") or "")
-        p.save()
-        on_payment_success(p)
-    else:
-        p.status = Payment.Status.FAILED
-        p.save()
-        on_payment_failure(p)
-        return p
 
-    # If we know the registration that initiated this payment, finalize it now.
-    try:
-        reg_id = (p.metadata or {}).get("reg_id")
-        if reg_id:
-            from presentations.services import set_status_final  # local import to avoid circulars
-            from presentations.models import Registration
-            reg = (
-                Registration.objects
-                .select_for_update()
-                .select_related("course", "user")
-                .get(id=int(reg_id), user=user)
-            )
-            set_status_final([reg])
-    except Exception:
-        pass
+def verify_batch_by_authorities(*, user: User, authorities: List[str]) -> List[Payment]:
+    """
+    Verify several of the user's payments in one call (e.g. multi-course checkout).
+    Gateway calls run concurrently and outside any transaction; results are written with one bulk_update
+    and each settled payment gets its finalize_payment task. Unknown authorities are skipped.
+    """
+    if not user or not user.is_authenticated:
+        raise CustomAPIException(
+            code=EC.PAY_AUTH_REQUIRED,
+            message="Authentication required",
+            status_code=401,
+        )
 
-    return p
+    authorities = list(dict.fromkeys(a for a in authorities if a))
+    payments = {p.authority: p for p in Payment.objects.filter(user=user, authority__in=authorities)}
+    pending = [p for p in payments.values() if p.status == Payment.Status.PENDING]
+
+    merchant = settings.ZARINPAL_MERCHANT_ID
+    results = _verify_many(merchant_id=merchant, payments=pending, return_exceptions=True)
+
+    if results:
+        now = timezone.now()
+        with transaction.atomic():
+            locked = {
+                p.pk: p
+                for p in Payment.objects.select_for_update(of=("self",), skip_locked=True)
+                .filter(pk__in=[p.pk for p, _ in results], status=Payment.Status.PENDING)
+            }
+            settled = []
+            for snapshot, res in results:
+                p = locked.get(snapshot.pk)
+                if p is None:
+                    continue  # settled (or being settled) by a concurrent request
+                _apply_verify_result(p, res)
+                p.updated_at = now
+                settled.append(p)
+            Payment.objects.bulk_update(settled, fields=VERIFY_RESULT_FIELDS, batch_size=100)
+            for p in settled:
+                _enqueue_finalize(p)
+                payments[p.authority] = p
+
+    return [payments[a] for a in authorities if a in payments]
+
+
+def _enqueue_finalize(p: Payment) -> None:
+    # domain hooks + registration finalization run in a task once the payment row is committed
+    from .tasks import finalize_payment
+    transaction.on_commit(lambda: finalize_payment.delay(p.id))
 
 def startpay(authority: str) -> str:
-    current_payment = Payment.objects.filter(authority=authority).last()
-    if not current_payment:
+    # authority is indexed but not unique, so take the latest row; blank ones belong to failed initiations
+    current_payment = None
+    if authority:
+        current_payment = (
+            Payment.objects.select_related("user")
+            .only("id", "user", "target_type", "target_id", "amount", "description")
+            .filter(authority=authority)
+            .order_by("-id")
+            .first()
+        )
+    if current_payment is None:
         raise CustomAPIException(
             code=EC.PAY_NOT_FOUND_FOR_USER,
             message="Payment not found for this user/authority",
@@ -0,0 +1,54 @@
+import logging
+
+from celery import shared_task
+from django.db import transaction
+from presentations.models import Registration
+from presentations.services import set_status_final
+from .models import Payment
+from .domain_hooks import on_payment_success, on_payment_failure
+
+logger = logging.getLogger(__name__)
+
+FINALIZE_MAX_RETRIES = 5
+
+
+@shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, retry_backoff_max=600, retry_jitter=True, max_retries=FINALIZE_MAX_RETRIES)
+def finalize_payment(self, payment_id: int):
+    """
+    Run the domain side effects of a verified payment after the verify request has returned.
+    Every step skips work that is already done, so a retry only redoes what failed.
+    """
+    p = Payment.objects.select_related("user").get(id=payment_id)
+    if p.status == Payment.Status.SUCCESSFUL:
+        # the registration does not depend on the hooks, so a failing hook cannot hold it back
+        _finalize_registration(p)
+        on_payment_success(p)
+    elif p.status == Payment.Status.FAILED:
+        on_payment_failure(p)
+
+
+def _finalize_registration(p: Payment) -> None:
+    """
+    Finalize the payer's registration for the paid course: the one recorded in metadata["reg_id"],
+    else (e.g. a payment re-opened through startpay) the payer's registration for the parent course,
+    the first id of the "PARENT_ID,CHILD_ID,..." target_id. Always matched on the payment's user.
+    """
+    if p.target_type != Payment.TargetType.COURSE:
+        return
+    reg_id = (p.metadata or {}).get("reg_id")
+    try:
+        if reg_id:
+            lookup = {"id": int(reg_id)}
+        else:
+            lookup = {"course_id": int(p.target_id.split(",")[0])}
+        with transaction.atomic():
+            reg = (
+                Registration.objects
+                .select_for_update()
+                .select_related("course", "user")
+                .get(user=p.user, **lookup)
+            )
+            if reg.status != Registration.Status.FINAL:
+                set_status_final([reg])
+    except (Registration.DoesNotExist, ValueError, TypeError):
+        logger.warning("payment %s: registration %r not found for finalization", p.id, reg_id or p.target_id)
@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import VerifyPaymentView, CallbackView, StartpaymentView
+from .views import VerifyPaymentView, VerifyBatchPaymentView, CallbackView, StartpaymentView
 
 urlpatterns = [
     path("verify/", VerifyPaymentView.as_view()),
+    path("verify_batch/", VerifyBatchPaymentView.as_view()),
     path("callback/", CallbackView.as_view()),
     path("startpay/", StartpaymentView.as_view())
 ]
\ No newline at end of file
@@ -8,10 +8,10 @@ from rest_framework.views import APIView
 from drf_spectacular.utils import extend_schema, OpenApiResponse
 
 from .serializers import (
-    VerifySerializer,
+    VerifySerializer, VerifyBatchSerializer,
     PaymentSerializer, StartPaymentSerializer,
 )
-from .services import verify_by_authority, startpay
+from .services import verify_by_authority, verify_batch_by_authorities, startpay
 
 
 class VerifyPaymentView(APIView):
@@ -32,6 +32,24 @@ class VerifyPaymentView(APIView):
         return Response(PaymentSerializer(p).data, status=status.HTTP_200_OK)
 
 
+class VerifyBatchPaymentView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        request=VerifyBatchSerializer,
+        responses={
+            200: PaymentSerializer(many=True),
+            401: OpenApiResponse(description="Unauthenticated"),
+        },
+        description="Verify several payments at once; gateway calls are issued concurrently. Unknown authorities are skipped."
+    )
+    def post(self, request):
+        s = VerifyBatchSerializer(data=request.data)
+        s.is_valid(raise_exception=True)
+        payments = verify_batch_by_authorities(user=request.user, authorities=s.validated_data["authorities"])
+        return Response(PaymentSerializer(payments, many=True).data, status=status.HTTP_200_OK)
+
+
 class CallbackView(APIView):
     permission_classes = []
 
@@ -1,10 +1,23 @@
-from django.contrib import admin
+from operator import attrgetter
+
+from django.contrib import admin, messages
 from django.utils import timezone
 
 from .models import Course, Presenter, ScheduleRule, Registration, CourseSession
-from .services import set_status_approved, set_status_rejected, set_status_final
+from .services import bulk_set_status_approved, bulk_set_status_rejected, bulk_set_status_final
+
+
+_get_email = attrgetter("user.email")
+_get_first_name = attrgetter("user.first_name")
+_get_last_name = attrgetter("user.last_name")
+_get_phone = attrgetter("user.phone_number")
 
 
+def _user_attr(getter, obj) -> str:
+    try:
+        return getter(obj) or ""
+    except AttributeError:
+        return ""
 
 
 class ScheduleInline(admin.TabularInline):
@@ -25,6 +38,7 @@ class CourseAdmin(admin.ModelAdmin):
 @admin.register(CourseSession)
 class CourseSessionAdmin(admin.ModelAdmin):
     list_display = ("course", "start_time", "end_time")
+    list_select_related = ("course",)
     search_fields = ("course__name", "course__subtitle")
     list_filter = ("course",)
 
@@ -108,55 +122,59 @@ class RegistrationAdmin(admin.ModelAdmin):
     
     actions = ("approve_selected", "reject_selected", "finalize_selected")
 
+    def get_queryset(self, request):
+        # detail page and action handlers read user/course too; join them once
+        return super().get_queryset(request).select_related("user", "course")
+
     
 
     @admin.display(ordering="user__email", description="User email")
     def user_email(self, obj: Registration) -> str:
-        return getattr(obj.user, "email", "") or ""
+        return _user_attr(_get_email, obj)
 
     @admin.display(description="User name")
     def user_full_name(self, obj: Registration) -> str:
-        fn = (getattr(obj.user, "first_name", "") or "").strip()
-        ln = (getattr(obj.user, "last_name", "") or "").strip()
+        fn = _user_attr(_get_first_name, obj).strip()
+        ln = _user_attr(_get_last_name, obj).strip()
         return f"{fn} {ln}".strip() or "(no name)"
 
     @admin.display(description="First name")
     def user_first_name(self, obj: Registration) -> str:
-        return getattr(obj.user, "first_name", "") or ""
+        return _user_attr(_get_first_name, obj)
 
     @admin.display(description="Last name")
     def user_last_name(self, obj: Registration) -> str:
-        return getattr(obj.user, "last_name", "") or ""
+        return _user_attr(_get_last_name, obj)
 
     @admin.display(ordering="user__phone_number", description="Phone")
     def user_phone(self, obj: Registration) -> str:
-        return getattr(obj.user, "phone_number", "") or ""
+        return _user_attr(_get_phone, obj)
 
     
 
     def approve_selected(self, request, queryset):
-        count = 0
-        for reg in queryset.select_related("course", "user"):
-            set_status_approved(reg, actor=request.user)
-            count += 1
+        count, failed, skipped = bulk_set_status_approved(queryset, actor=request.user, now=timezone.now())
         self.message_user(request, f"Approved {count} registration(s)")
+        if failed:
+            self.message_user(
+                request,
+                "Could not issue a payment link for: " + ", ".join(str(reg) for reg in failed),
+                level=messages.WARNING,
+            )
+        if skipped:
+            self.message_user(
+                request,
+                "Skipped, changed or being processed elsewhere: " + ", ".join(str(reg) for reg in skipped),
+                level=messages.WARNING,
+            )
     approve_selected.short_description = "Approve (and issue payment link if applicable)"
 
     def reject_selected(self, request, queryset):
-        count = 0
-        for reg in queryset.select_related("course", "user"):
-            
-            if not reg.rejection_reason:
-                continue
-            set_status_rejected(reg, actor=request.user)
-            count += 1
+        count = bulk_set_status_rejected(queryset, actor=request.user, now=timezone.now())
         self.message_user(request, f"Rejected {count} registration(s)")
     reject_selected.short_description = "Reject (requires rejection_reason)"
 
     def finalize_selected(self, request, queryset):
-        count = 0
-        for reg in queryset.select_related("course", "user"):
-            set_status_final(reg, actor=request.user)
-            count += 1
+        count = bulk_set_status_final(queryset, actor=request.user, now=timezone.now())
         self.message_user(request, f"Marked {count} registration(s) as paid")
     finalize_selected.short_description = "Mark paid (FINAL)"
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-16 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presentations', '0007_coursesession_description_coursesession_subtitle_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['-submitted_at'], name='reg_submitted_desc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['status', '-submitted_at'], name='reg_status_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['course', 'status'], name='reg_course_status_idx'),
+        ),
+    ]
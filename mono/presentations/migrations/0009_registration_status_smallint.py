@@ -0,0 +1,66 @@
+# Generated by Django 5.2.6 on 2026-10-16 12:30
+
+from django.db import migrations, models
+
+STATUS_CODES = {
+    "SUBMITTED": 1,
+    "RESERVED": 2,
+    "QUEUED": 3,
+    "APPROVED": 4,
+    "FINAL": 5,
+    "REJECTED": 6,
+    "CANCELLED": 7,
+}
+
+
+def forwards(apps, schema_editor):
+    Registration = apps.get_model("presentations", "Registration")
+    for name, code in STATUS_CODES.items():
+        Registration.objects.filter(status=name).update(status_code=code)
+
+
+def backwards(apps, schema_editor):
+    Registration = apps.get_model("presentations", "Registration")
+    for name, code in STATUS_CODES.items():
+        Registration.objects.filter(status_code=code).update(status=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presentations', '0008_registration_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registration',
+            name='status_code',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Submitted'), (2, 'Reserved'), (3, 'Queued'), (4, 'Approved'), (5, 'Finalized'), (6, 'Rejected'), (7, 'Cancelled')], default=1),
+        ),
+        migrations.RunPython(forwards, backwards),
+        migrations.RemoveIndex(
+            model_name='registration',
+            name='reg_status_submitted_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='registration',
+            name='reg_course_status_idx',
+        ),
+        migrations.RemoveField(
+            model_name='registration',
+            name='status',
+        ),
+        migrations.RenameField(
+            model_name='registration',
+            old_name='status_code',
+            new_name='status',
+        ),
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['status', '-submitted_at'], name='reg_status_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['course', 'status'], name='reg_course_status_idx'),
+        ),
+    ]
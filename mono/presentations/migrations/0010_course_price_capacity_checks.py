@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-16 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presentations', '0009_registration_status_smallint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='course',
+            name='price',
+            field=models.IntegerField(),
+        ),
+        migrations.AddConstraint(
+            model_name='course',
+            constraint=models.CheckConstraint(condition=models.Q(('price__gte', 0)), name='course_price_nonneg'),
+        ),
+        migrations.AddConstraint(
+            model_name='course',
+            constraint=models.CheckConstraint(condition=models.Q(('capacity__gte', 0)), name='course_capacity_nonneg'),
+        ),
+    ]
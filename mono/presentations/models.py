@@ -2,6 +2,7 @@ from django.conf import settings
 from django.db import models
 from django.utils import timezone
 from django.core.validators import MinValueValidator
+from django.utils.functional import cached_property
 from django.utils.text import slugify
 
 User = settings.AUTH_USER_MODEL
@@ -9,6 +10,23 @@ User = settings.AUTH_USER_MODEL
 
 
 
+def _slug_base(name: str) -> str:
+    # leave room for a "-<n>" suffix within max_length=220
+    return slugify(name)[:210].strip("-") or "course"
+
+
+def _make_unique_slug(name: str, existing: set) -> str:
+    """Slug for `name` not present in `existing`; the result is added to `existing`
+    so callers assigning slugs to many courses can reuse the same set."""
+    base = _slug_base(name)
+    slug, n = base, 2
+    while slug in existing:
+        slug = f"{base}-{n}"
+        n += 1
+    existing.add(slug)
+    return slug
+
+
 class Presenter(models.Model):
     full_name = models.CharField(max_length=120)
     bio = models.TextField(blank=True)
@@ -34,7 +52,7 @@ class Course(models.Model):
     classes_count = models.PositiveIntegerField(default=0)
 
     capacity = models.PositiveIntegerField(default=0)
-    price = models.IntegerField(validators=[MinValueValidator(0)])
+    price = models.IntegerField()
 
     children = models.ManyToManyField(
         "self",
@@ -56,13 +74,29 @@ class Course(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.name)[:220]
+            base = _slug_base(self.name)
+            taken = set(Course.objects.filter(slug__startswith=base).values_list("slug", flat=True))
+            self.slug = _make_unique_slug(self.name, taken)
         return super().save(*args, **kwargs)
 
+    class Meta:
+        # enforced by the database; model validation (admin forms) checks them too
+        constraints = [
+            models.CheckConstraint(condition=models.Q(price__gte=0), name="course_price_nonneg"),
+            models.CheckConstraint(condition=models.Q(capacity__gte=0), name="course_capacity_nonneg"),
+        ]
+
+    @cached_property
+    def schedule_rules(self) -> list:
+        """Schedule as a plain list; prefetching with to_attr="schedule_rules" fills it upfront."""
+        return list(self.schedule.all())
+
     def remained_capacity(self) -> int:
         """Remaining seats considering both direct and child purchases."""
-        used = _taken_seats(self)
         cap = self.capacity
+        if cap == 0:
+            return 0
+        used = _taken_seats(self, limit=cap)
         return max(cap - used, 0)
 
     def __str__(self):
@@ -93,18 +127,19 @@ class ScheduleRule(models.Model):
 
 
 class Registration(models.Model):
-    class Status(models.TextChoices):
-        SUBMITTED = "SUBMITTED", "Submitted"
-        RESERVED = "RESERVED", "Reserved"   # capacity full -> RESERVED
-        QUEUED = "QUEUED", "Queued"         # capacity available -> QUEUED
-        APPROVED = "APPROVED", "Approved"
-        FINAL = "FINAL", "Finalized"
-        REJECTED = "REJECTED", "Rejected"
-        CANCELLED = "CANCELLED", "Cancelled"
+    class Status(models.IntegerChoices):
+        # stored as small ints; the API still exposes the member names (see RegistrationSerializer)
+        SUBMITTED = 1, "Submitted"
+        RESERVED = 2, "Reserved"   # capacity full -> RESERVED
+        QUEUED = 3, "Queued"       # capacity available -> QUEUED
+        APPROVED = 4, "Approved"
+        FINAL = 5, "Finalized"
+        REJECTED = 6, "Rejected"
+        CANCELLED = 7, "Cancelled"
 
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="registrations")
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="course_registrations")
-    status = models.CharField(max_length=12, choices=Status.choices, default=Status.SUBMITTED)
+    status = models.PositiveSmallIntegerField(choices=Status.choices, default=Status.SUBMITTED)
 
     # optional resume link or blob pointer
     resume_url = models.URLField(blank=True)
@@ -121,9 +156,16 @@ class Registration(models.Model):
     class Meta:
         unique_together = ("course", "user")
         ordering = ["-submitted_at"]
+        indexes = [
+            models.Index(fields=["-submitted_at"], name="reg_submitted_desc_idx"),
+            models.Index(fields=["status", "-submitted_at"], name="reg_status_submitted_idx"),
+            models.Index(fields=["course", "status"], name="reg_course_status_idx"),
+        ]
 
     def __str__(self):
-        return f"Reg<{self.user_id}:{self.course.slug}:{self.status}>"
+        # only use the slug when the course is already loaded; never query from __str__
+        course = self.course.slug if Registration.course.is_cached(self) else f"course#{self.course_id}"
+        return f"Reg<{self.user_id}:{course}:{self.Status(self.status).name}>"
 
 
 class RegistrationItem(models.Model):
@@ -143,7 +185,12 @@ class RegistrationItem(models.Model):
         unique_together = ("registration", "child_course")
 
     def __str__(self):
-        return f"RegItem<{self.registration_id}:{self.child_course.slug}:{self.price}>"
+        child = (
+            self.child_course.slug
+            if RegistrationItem.child_course.is_cached(self)
+            else f"course#{self.child_course_id}"
+        )
+        return f"RegItem<{self.registration_id}:{child}:{self.price}>"
 
 class CourseSession(models.Model):
     title = models.CharField(max_length=200, blank=True)
@@ -160,22 +207,53 @@ class CourseSession(models.Model):
 
 COUNT_STATUSES = [Registration.Status.FINAL]
 
-def _taken_seats(course) -> int:
+def annotate_taken_seats(queryset):
+    """Annotate a Course queryset with its occupied seats so `remained_capacity`
+    needs no extra queries per row."""
+    return queryset.annotate(
+        _finalized_as_parent=models.Count(
+            "registrations",
+            filter=models.Q(registrations__status__in=COUNT_STATUSES),
+            distinct=True,
+        ),
+        _finalized_as_child=models.Count(
+            "registration_items",
+            filter=models.Q(registration_items__registration__status__in=COUNT_STATUSES),
+            distinct=True,
+        ),
+    )
+
+
+def _taken_seats(course, limit: int | None = None) -> int:
     """How many seats of `course` are occupied in COUNT_STATUSES,
-    counting both direct (parent) and child purchases."""
-    direct = Registration.objects.filter(
-        course=course,
-        status__in=COUNT_STATUSES,
-    ).count()
-    as_child = RegistrationItem.objects.filter(
-        child_course=course,
-        registration__status__in=COUNT_STATUSES,
-    ).count()
-    return direct + as_child
+    counting both direct (parent) and child purchases.
+
+    With `limit`, counting stops once `limit` seats are found (LIMIT-bounded
+    scans instead of full COUNTs); callers only compare the result to capacity."""
+    if hasattr(course, "_finalized_as_parent") and hasattr(course, "_finalized_as_child"):
+        return course._finalized_as_parent + course._finalized_as_child
+    if limit is not None:
+        direct = len(Registration.objects.filter(
+            course=course,
+            status__in=COUNT_STATUSES,
+        ).values_list("id", flat=True)[:limit])
+        if direct >= limit:
+            return direct
+        as_child = len(RegistrationItem.objects.filter(
+            child_course=course,
+            registration__status__in=COUNT_STATUSES,
+        ).values_list("id", flat=True)[:limit - direct])
+        return direct + as_child
+    counts = annotate_taken_seats(Course.objects.filter(pk=course.pk)).values(
+        "_finalized_as_parent", "_finalized_as_child"
+    ).first()
+    if counts is None:
+        return 0
+    return counts["_finalized_as_parent"] + counts["_finalized_as_child"]
 
 def _is_full_by_count(course) -> bool:
     """True if course capacity is exhausted according to COUNT_STATUSES."""
     cap = course.capacity
     if cap == 0:
         return True
-    return _taken_seats(course) >= cap
\ No newline at end of file
+    return _taken_seats(course, limit=cap) >= cap
\ No newline at end of file
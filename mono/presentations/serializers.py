@@ -1,8 +1,14 @@
+import logging
+
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from .models import Course, Presenter, ScheduleRule, Registration, RegistrationItem, CourseSession
+from django.db.models import F, Prefetch, Sum
+from django.db.models.functions import Coalesce
+from .models import Course, Presenter, ScheduleRule, Registration, RegistrationItem, CourseSession, annotate_taken_seats
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 
 class PresenterSerializer(serializers.ModelSerializer):
@@ -11,26 +17,40 @@ class PresenterSerializer(serializers.ModelSerializer):
         fields = ("id", "full_name", "bio", "email", "website")
 
 
+_WEEKDAY_LABELS = dict(ScheduleRule.Weekday.choices)
+
+
 class ScheduleRuleSerializer(serializers.ModelSerializer):
-    weekday_display = serializers.CharField(source="get_weekday_display", read_only=True)
+    weekday_display = serializers.SerializerMethodField()
 
     class Meta:
         model = ScheduleRule
         fields = ("weekday", "weekday_display", "start_time", "end_time")
 
+    def get_weekday_display(self, obj: ScheduleRule) -> str:
+        return _WEEKDAY_LABELS.get(obj.weekday, str(obj.weekday))
+
 
 class ChildCourseSerializer(serializers.ModelSerializer):
-    schedule = ScheduleRuleSerializer(many=True, read_only=True)
+    schedule = ScheduleRuleSerializer(source="schedule_rules", many=True, read_only=True)
 
     class Meta:
         model = Course
         fields = ("id", "name", "capacity", "price", "slug", "is_active", "schedule")
 
+    @classmethod
+    def eager_queryset(cls):
+        """Child courses with only the columns rendered here (no description etc.)."""
+        return Course.objects.only("id", "name", "capacity", "price", "slug", "is_active").prefetch_related(
+            Prefetch("schedule", queryset=ScheduleRule.objects.order_by("weekday", "start_time"), to_attr="schedule_rules")
+        )
+
 
 class CourseSerializer(serializers.ModelSerializer):
     presenters = PresenterSerializer(many=True, read_only=True)
     schedule = ScheduleRuleSerializer(many=True, read_only=True)
     children = ChildCourseSerializer(many=True, read_only=True)
+    remained_capacity = serializers.SerializerMethodField()
 
     class Meta:
         model = Course
@@ -54,6 +74,30 @@ class CourseSerializer(serializers.ModelSerializer):
             "children",
         )
 
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Prefetches needed to render the nested presenters/schedule/children."""
+        return queryset.prefetch_related(
+            "presenters",
+            "schedule",
+            Prefetch("children", queryset=ChildCourseSerializer.eager_queryset()),
+        )
+
+    def to_representation(self, instance):
+        if settings.DEBUG:
+            cached = getattr(instance, "_prefetched_objects_cache", {})
+            missing = [rel for rel in ("presenters", "schedule", "children") if rel not in cached]
+            if missing:
+                logger.warning(
+                    "CourseSerializer rendered course %s without prefetched %s; "
+                    "use CourseSerializer.setup_eager_loading()", instance.pk, ", ".join(missing),
+                )
+        return super().to_representation(instance)
+
+    def get_remained_capacity(self, obj: Course) -> int:
+        # uses the annotate_taken_seats() counts when the view provided them
+        return obj.remained_capacity()
+
 
 class RegistrationItemSerializer(serializers.ModelSerializer):
     child = ChildCourseSerializer(source="child_course", read_only=True)
@@ -73,10 +117,15 @@ class RegistrationCreateSerializer(serializers.Serializer):
     )
 
 
+_STATUS_NAMES = {s.value: s.name for s in Registration.Status}
+
+
 class RegistrationSerializer(serializers.ModelSerializer):
     course = CourseSerializer(read_only=True)
     items = RegistrationItemSerializer(many=True, read_only=True)
-    total_amount = serializers.SerializerMethodField()
+    status = serializers.SerializerMethodField()
+    # annotated by setup_eager_loading()
+    total_amount = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Registration
@@ -104,10 +153,18 @@ class RegistrationSerializer(serializers.ModelSerializer):
             "total_amount",
         )
 
-    def get_total_amount(self, obj: Registration) -> int:
-        base = obj.course.price or 0
-        extra = sum((i.price or 0) for i in obj.items.all())
-        return base + extra
+    def get_status(self, obj: Registration) -> str:
+        return _STATUS_NAMES.get(obj.status, "")
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Annotates total_amount and prefetches the nested course and items."""
+        return queryset.annotate(
+            total_amount=F("course__price") + Coalesce(Sum("items__price"), 0),
+        ).prefetch_related(
+            Prefetch("course", queryset=CourseSerializer.setup_eager_loading(annotate_taken_seats(Course.objects.all()))),
+            Prefetch("items__child_course", queryset=ChildCourseSerializer.eager_queryset()),
+        )
 
 
 class SkyroomLinkGeneratorSerializer(serializers.Serializer):
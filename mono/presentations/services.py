@@ -1,18 +1,24 @@
+import hashlib
+import json
 from datetime import datetime, timedelta
 
 import requests
-from django.db import transaction
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch, Q, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 from rest_framework import status
 from acm.exceptions import CustomAPIException
+from acm.http_utils import PooledSession
 from acm import error_codes as EC
 
 from payment.models import Payment
 from payment.services import initiate_payment_for_target
-from .models import Course, Registration, RegistrationItem, _is_full_by_count, CourseSession
-from notification.services import send_status_change_email
+from .models import Course, Registration, RegistrationItem, CourseSession, annotate_taken_seats
+from notification.services import send_status_change_email, send_status_change_emails
 from accounts.models import UserExtraData
 from django.conf import settings
 
@@ -22,6 +28,29 @@ SKYROOM_BASEURL = settings.SKYROOM_BASEURL
 SKYROOM_APIKEY = settings.SKYROOM_APIKEY
 SKYROOM_ROOMID = settings.SKYROOM_ROOMID
 HEADERS = {"accept": "application/json", "content-type": "application/json"}
+SUBMIT_IDEMPOTENCY_TTL = 10
+_SUBMIT_PENDING = "pending"
+
+# pooled session for the Skyroom API, so TLS connections are reused across link requests;
+# its calls are non-idempotent POSTs, so only failed connection attempts are retried
+_http = PooledSession(
+    retries=3,
+    backoff_factor=0.3,
+    allowed_methods=[],
+    pool_connections=10,
+    pool_maxsize=50,
+    schemes=("https://", "http://"),
+)
+
+
+def _notify(**kwargs) -> None:
+    """Queue a status email once the surrounding transaction commits, keeping the template
+    lookup and Notification insert out of the locked section."""
+    transaction.on_commit(lambda: send_status_change_email(**kwargs))
+
+
+def _notify_many(items: list[tuple[str, str, dict | None]]) -> None:
+    transaction.on_commit(lambda: send_status_change_emails(items))
 
 
 def _is_full(capacity: int | None, taken: int) -> bool:
@@ -32,28 +61,82 @@ def _is_full(capacity: int | None, taken: int) -> bool:
     return taken >= capacity
 
 
-def _parent_capacity_full(course: Course) -> bool:
-    return _is_full_by_count(course)
+def _capacity_snapshot(course: Course, children: list[Course]) -> tuple[int, dict[int, int]]:
+    """Seats taken for the parent and each child, in one grouped query."""
+    rows = annotate_taken_seats(
+        Course.objects.filter(id__in=[course.id, *(c.id for c in children)])
+    ).values_list("id", "_finalized_as_parent", "_finalized_as_child")
+    taken = {cid: as_parent + as_child for cid, as_parent, as_child in rows}
+    return taken.get(course.id, 0), {c.id: taken.get(c.id, 0) for c in children}
+
 
+def _prefetched_items(reg: Registration):
+    """The prefetched `items` of `reg`, or None when they were not prefetched."""
+    return getattr(reg, "_prefetched_objects_cache", {}).get("items")
 
-def _child_capacity_full(child: Course) -> bool:
-    return _is_full_by_count(child)
+
+def _item_rows(reg: Registration) -> list[tuple[int, str, int]]:
+    """(child_course_id, child slug, price) per item; served from the prefetch cache when
+    `items__child_course` was prefetched, else one joined query."""
+    cached = _prefetched_items(reg)
+    if cached is not None:
+        return [(i.child_course_id, i.child_course.slug, i.price) for i in cached]
+    return list(reg.items.values_list("child_course_id", "child_course__slug", "price"))
 
 
 def _compute_total_amount(reg: Registration) -> int:
     parent = reg.course.price or 0
-    children = sum((i.price or 0) for i in reg.items.all())
-    return parent + children
+    cached = _prefetched_items(reg)
+    if cached is not None:
+        # no query; a free course without children is simply 0 here
+        return parent + sum((i.price or 0) for i in cached)
+    return parent + reg.items.aggregate(s=Coalesce(Sum("price"), 0))["s"]
 
 
-def _compose_description(reg: Registration) -> str:
-    child_slugs = ", ".join(i.child_course.slug for i in reg.items.all())
+def _compose_description(reg: Registration, child_slugs: list[str] | None = None) -> str:
+    if child_slugs is None:
+        child_slugs = [slug for _, slug, _ in _item_rows(reg)]
     if child_slugs:
-        return f"{reg.course.slug} + [{child_slugs}]"
+        return f"{reg.course.slug} + [{', '.join(child_slugs)}]"
     return reg.course.slug
 
 
-@transaction.atomic
+_CHECK_FIELDS = ("id", "name", "capacity", "price", "requires_approval")
+
+
+def _save_extra_updates(user: User, extra_updates: dict) -> None:
+    """Merge registration answers into UserExtraData: a SELECT, then one INSERT that already
+    carries the answers for a new row, or one UPDATE of just the touched columns."""
+    fields = {}
+    if "codeforces_score" in extra_updates:
+        try:
+            fields["codeforces_score"] = int(extra_updates["codeforces_score"])
+        except Exception:
+            pass
+    if "codeforces_handle" in extra_updates:
+        fields["codeforces_handle"] = str(extra_updates["codeforces_handle"])[:64]
+
+    extra, created = UserExtraData.objects.get_or_create(
+        user=user, defaults={**fields, "answers": dict(extra_updates)}
+    )
+    if created:
+        return
+    extra.answers = {**(extra.answers or {}), **extra_updates}
+    for field, value in fields.items():
+        setattr(extra, field, value)
+    extra.save(update_fields=["answers", *fields, "updated_at"])
+
+
+def _submit_key(user: User, course: Course, child_ids, extra_updates, resume_url) -> str:
+    # the whole payload, so a corrected resubmit (answers, resume) is never taken for a duplicate
+    raw = json.dumps(
+        [user.id, course.id, sorted(set(child_ids or [])), extra_updates or {}, resume_url or ""],
+        sort_keys=True,
+        default=str,
+    )
+    return "reg_submit:" + hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
 def submit_registration(
     *,
     course: Course,
@@ -62,11 +145,58 @@ def submit_registration(
     child_ids: list[int] | None = None,
     resume_url: str | None = None,
 ) -> Registration:
+    """
+    Idempotent wrapper around _submit_registration: an identical submit (same user, course,
+    children and answers) within SUBMIT_IDEMPOTENCY_TTL seconds returns the registration that
+    first submit wrote instead of re-running the flow.
+    """
+    key = _submit_key(user, course, child_ids, extra_updates, resume_url)
+    if not cache.add(key, _SUBMIT_PENDING, timeout=SUBMIT_IDEMPOTENCY_TTL):
+        reg_id = cache.get(key)
+        if reg_id not in (None, _SUBMIT_PENDING):
+            reg = Registration.objects.filter(pk=reg_id).first()
+            if reg is not None:
+                return reg
+        # the first submit has not finished yet, so there is no row it wrote to return
+        raise CustomAPIException(
+            code=EC.REG_SUBMIT_IN_PROGRESS,
+            message="This registration is already being submitted.",
+            status_code=status.HTTP_409_CONFLICT,
+        )
+    try:
+        reg, issue_link = _submit_registration(
+            course=course,
+            user=user,
+            extra_updates=extra_updates,
+            child_ids=child_ids,
+            resume_url=resume_url,
+        )
+        if issue_link:
+            # the gateway round trip runs after the course locks are released
+            _auto_progress_to_payment(reg, now=reg.submitted_at)
+    except Exception:
+        # a failed submit must not block the user's retry
+        cache.delete(key)
+        raise
+    cache.set(key, reg.pk, timeout=SUBMIT_IDEMPOTENCY_TTL)
+    return reg
+
+
+@transaction.atomic
+def _submit_registration(
+    *,
+    course: Course,
+    user: User,
+    extra_updates: dict | None = None,
+    child_ids: list[int] | None = None,
+    resume_url: str | None = None,
+) -> tuple[Registration, bool]:
     """
     Do NOT block when full.
     If parent OR any child is full => set RESERVED and force approval.
     Else QUEUED.
-    If no approval required AND status is QUEUED => auto-approve/finalize (free) or create payment link.
+    If no approval required AND status is QUEUED => auto-finalize (free) here, or return True so
+    the caller creates the payment link once this transaction (and its course locks) has committed.
 
     Additionally: prevent buying a course/child that the user already owns (FINAL),
     even if ownership came through a different parent registration.
@@ -78,10 +208,19 @@ def submit_registration(
             status_code=status.HTTP_403_FORBIDDEN,
         )
 
-    child_ids = list(dict.fromkeys(child_ids or []))
-
-    valid_children_qs = course.children.filter(is_active=True, id__in=child_ids)
-    valid_children = list(valid_children_qs)
+    # only used for the IN filter and the count check below, so order does not matter
+    child_ids = set(child_ids or [])
+
+    # Lock the parent, then the children in id order, so concurrent submits for the same
+    # courses serialize on the capacity check below instead of both passing it.
+    # Only the columns the checks below read are loaded.
+    course = Course.objects.select_for_update().only(*_CHECK_FIELDS).get(pk=course.pk)
+    valid_children = list(
+        course.children.select_for_update(of=("self",))
+        .filter(is_active=True, id__in=child_ids)
+        .only(*_CHECK_FIELDS)
+        .order_by("id")
+    )
     if len(valid_children) != len(child_ids):
         raise CustomAPIException(
             code=EC.REG_CHILD_INVALID_SELECTION,
@@ -92,18 +231,25 @@ def submit_registration(
     # ----------------------------
     # ALREADY-OWNED GUARD
     # ----------------------------
-    # All finalized registrations for this user:
-    finalized_regs = Registration.objects.filter(
-        user=user,
-        status=Registration.Status.FINAL,
-    )
-
-    owned_parent_ids = set(finalized_regs.values_list("course_id", flat=True))
-    owned_child_ids = set(
-        RegistrationItem.objects.filter(registration__in=finalized_regs)
-        .values_list("child_course_id", flat=True)
+    # Which of the requested courses the user already owns through finalized registrations,
+    # as parent or as child, in one UNION query scoped to the requested ids:
+    requested_ids = {course.id, *child_ids}
+    owned_ids = set(
+        Registration.objects.filter(
+            user=user,
+            status=Registration.Status.FINAL,
+            course_id__in=requested_ids,
+        )
+        .order_by()
+        .values_list("course_id", flat=True)
+        .union(
+            RegistrationItem.objects.filter(
+                registration__user=user,
+                registration__status=Registration.Status.FINAL,
+                child_course_id__in=requested_ids,
+            ).values_list("child_course_id", flat=True)
+        )
     )
-    owned_ids = owned_parent_ids | owned_child_ids
 
     if course.id in owned_ids:
         raise CustomAPIException(
@@ -121,65 +267,144 @@ def submit_registration(
             status_code=status.HTTP_409_CONFLICT,
         )
 
-    parent_full = _parent_capacity_full(course)
-    full_children = [c for c in valid_children if _child_capacity_full(c)]
+    parent_taken, child_taken = _capacity_snapshot(course, valid_children)
+    parent_full = _is_full(course.capacity, parent_taken)
+    full_children = [c for c in valid_children if _is_full(c.capacity, child_taken[c.id])]
     any_child_full = bool(full_children)
     forced_waitlist = parent_full or any_child_full
 
-    reg, created = Registration.objects.get_or_create(course=course, user=user)
-    if (not created) and reg.status in [Registration.Status.FINAL]:
-        raise CustomAPIException(
-            code=EC.REG_ALREADY_FINAL_OR_APPROVED,
-            message="You already have an approved registration for this presentation.",
-            status_code=status.HTTP_409_CONFLICT,
-        )
-
-    reg.resume_url = resume_url or reg.resume_url
-    reg.submitted_at = timezone.now()
-    reg.rejection_reason = ""
-    reg.status = Registration.Status.RESERVED if forced_waitlist else Registration.Status.QUEUED
-    reg.save()
+    requires_approval = bool(getattr(course, "requires_approval", False)) or any(
+        getattr(c, "requires_approval", False) for c in valid_children
+    ) or forced_waitlist
+    # only a QUEUED registration can auto-progress, and forced_waitlist is what makes it RESERVED
+    auto_progress = not requires_approval
+
+    # a new registration is inserted with its final submission state; an existing one
+    # gets a single UPDATE of just the submission fields
+    now = timezone.now()
+    submission = {
+        "submitted_at": now,
+        "rejection_reason": "",
+        "status": Registration.Status.RESERVED if forced_waitlist else Registration.Status.QUEUED,
+    }
+    # INSERT first (the common case) and fall back to the existing row on the
+    # unique (course, user) violation, instead of get_or_create's SELECT-then-INSERT
+    try:
+        with transaction.atomic():
+            reg = Registration.objects.create(
+                course=course, user=user, resume_url=resume_url or "", **submission
+            )
+        created = True
+    except IntegrityError:
+        reg = Registration.objects.select_for_update().get(course=course, user=user)
+        created = False
+    if not created:
+        if reg.status in [Registration.Status.FINAL]:
+            raise CustomAPIException(
+                code=EC.REG_ALREADY_FINAL_OR_APPROVED,
+                message="You already have an approved registration for this presentation.",
+                status_code=status.HTTP_409_CONFLICT,
+            )
+        if (
+            reg.status == submission["status"]
+            and not reg.rejection_reason
+            and (resume_url or reg.resume_url) == reg.resume_url
+            and not extra_updates
+            and set(reg.items.values_list("child_course_id", flat=True)) == child_ids
+        ):
+            # identical resubmission (e.g. a double click, or a retry after the payment
+            # link failed): nothing to write or announce
+            return reg, auto_progress
+        reg.resume_url = resume_url or reg.resume_url
+        for field, value in submission.items():
+            setattr(reg, field, value)
+        reg.save(update_fields=["resume_url", *submission])
 
     if extra_updates:
-        extra, _ = UserExtraData.objects.get_or_create(user=user)
-        extra.answers = {**(extra.answers or {}), **extra_updates}
-        if "codeforces_score" in extra_updates:
-            try:
-                extra.codeforces_score = int(extra_updates["codeforces_score"])
-            except Exception:
-                pass
-        if "codeforces_handle" in extra_updates:
-            extra.codeforces_handle = str(extra_updates["codeforces_handle"])[:64]
-        extra.save()
+        _save_extra_updates(user, extra_updates)
 
     RegistrationItem.objects.filter(registration=reg).delete()
-    for c in valid_children:
-        RegistrationItem.objects.create(
-            registration=reg,
-            child_course=c,
-            price=c.price,
+    if valid_children:
+        RegistrationItem.objects.bulk_create(
+            [RegistrationItem(registration=reg, child_course=c, price=c.price) for c in valid_children],
+            batch_size=500,
         )
 
-    send_status_change_email(
+    # reload once with everything the email/payment steps below read
+    reg = (
+        Registration.objects.select_related("course", "user")
+        .prefetch_related(Prefetch("items", queryset=RegistrationItem.objects.select_related("child_course")))
+        .get(pk=reg.pk)
+    )
+
+    _notify(
         to=user.email,
         status_code="COURSE_REQUEST_SUBMITTED",
         extra={
             "course": course.name,
-            "status": reg.status,
+            "status": Registration.Status(reg.status).name,
             "waitlisted_children": ", ".join(ch.name for ch in full_children) if full_children else "",
         },
     )
 
-    requires_approval = bool(getattr(course, "requires_approval", False)) or any(
-        getattr(c, "requires_approval", False) for c in valid_children
-    ) or forced_waitlist
+    if auto_progress and _compute_total_amount(reg) <= 0:
+        # a free registration takes its seat right away, so it is finalized under the locks
+        _auto_progress_to_payment(reg, now=now)
+        auto_progress = False
 
-    if not requires_approval and reg.status == Registration.Status.QUEUED:
-        _auto_progress_to_payment(reg)
+    return reg, auto_progress
+
+def _issue_payment_link(
+    reg: Registration,
+    *,
+    override_amount: int | None = None,
+    description: str | None = None,
+) -> str:
+    # at most one query for everything the link needs from the items
+    items = _item_rows(reg)
+    child_ids = [child_id for child_id, _, _ in items]
+
+    if override_amount is not None:
+        amount = override_amount
+    else:
+        amount = (reg.course.price or 0) + sum((price or 0) for _, _, price in items)
+
+    parent_id = reg.course.id
+    # target_id as a CSV bundle: "parent,child1,child2"
+    bundle_target_id = ",".join([str(parent_id), *map(str, child_ids)])
+
+    meta = {
+        "reg_id": reg.id,
+        "parent_course_id": parent_id,
+        "child_course_ids": child_ids,
+    }
+
+    payment_result = initiate_payment_for_target(
+        user=reg.user,
+        target_type=Payment.TargetType.COURSE,
+        target_id=bundle_target_id,
+        amount=amount,
+        description=description or _compose_description(reg, [slug for _, slug, _ in items]),
+        extra_metadata=meta,
+    )
+    return payment_result.url
+
+
+def _load_relations(*regs: Registration) -> None:
+    """Attach course and user to registrations that were loaded without them, in one joined
+    query, so the status helpers never fall into per-access FK fetches."""
+    cold = [
+        r for r in regs
+        if not (Registration.course.is_cached(r) and Registration.user.is_cached(r))
+    ]
+    if not cold:
+        return
+    fresh = Registration.objects.select_related("course", "user").in_bulk([r.pk for r in cold])
+    for r in cold:
+        r.course = fresh[r.pk].course
+        r.user = fresh[r.pk].user
 
-    return reg
 
-@transaction.atomic
 def set_status_approved(
     reg: Registration,
     *,
@@ -187,76 +412,76 @@ def set_status_approved(
     payment_link: str | None = None,
     override_amount: int | None = None,
     description: str | None = None,
+    now: datetime | None = None,
 ) -> Registration:
-    reg.status = Registration.Status.APPROVED
-
+    _load_relations(reg)
     if payment_link is None:
-        amount = override_amount if override_amount is not None else _compute_total_amount(reg)
-
-        parent_id = reg.course.id
-        child_ids = list(reg.items.values_list("child_course_id", flat=True))
-        # target_id as a CSV bundle: "parent,child1,child2"
-        bundle_target_id = ",".join([str(parent_id), *map(str, child_ids)])
-
-        meta = {
-            "reg_id": reg.id,
-            "parent_course_id": parent_id,
-            "child_course_ids": child_ids,
-        }
-
-        payment_result = initiate_payment_for_target(
-            user=reg.user,
-            target_type=Payment.TargetType.COURSE,
-            target_id=bundle_target_id,
-            amount=amount,
-            description=description or _compose_description(reg),
-            extra_metadata=meta,
-        )
-        reg.payment_link = payment_result.url
-    else:
-        reg.payment_link = payment_link
+        # issued before the transaction opens, so no lock is held over the gateway round trip
+        payment_link = _issue_payment_link(reg, override_amount=override_amount, description=description)
 
-    reg.decided_at = timezone.now()
-    reg.save(update_fields=["status", "payment_link", "decided_at"])
+    with transaction.atomic():
+        reg.status = Registration.Status.APPROVED
+        reg.payment_link = payment_link
+        reg.decided_at = now or timezone.now()
+        reg.save(update_fields=["status", "payment_link", "decided_at"])
 
-    send_status_change_email(
-        to=reg.user.email,
-        status_code="COURSE_REQUEST_APPROVED",
-        extra={"course": reg.course.name, "payment_link": reg.payment_link},
-    )
+        _notify(
+            to=reg.user.email,
+            status_code="COURSE_REQUEST_APPROVED",
+            extra={"course": reg.course.name, "payment_link": reg.payment_link},
+        )
     return reg
 
 
 @transaction.atomic
-def set_status_final(regs: list[Registration], *, actor: User | None = None) -> list[Registration]:
+def set_status_final(
+    regs: list[Registration], *, actor: User | None = None, now: datetime | None = None
+) -> list[Registration]:
+    """
+    Finalize `regs` with one UPDATE and email each owner once. Every owner of `regs` is emailed,
+    so callers must pass registrations already matched on their user and course (payment
+    finalization looks the registration up by the payer, never by a bare id from the gateway).
+    """
     if len(regs) == 0:
         return regs
 
+    _load_relations(*regs)
+    now = now or timezone.now()
+    Registration.objects.filter(pk__in=[r.pk for r in regs]).update(
+        status=Registration.Status.FINAL, decided_at=now
+    )
     for reg in regs:
         reg.status = Registration.Status.FINAL
-        reg.decided_at = timezone.now()
-        reg.save(update_fields=["status", "decided_at"])
+        reg.decided_at = now
 
-    send_status_change_email(
-        to=regs[0].user.email,
-        status_code="COURSE_REQUEST_FINAL",
-        extra={"course": regs[0].course.name},
-    )
+    # one email per user, naming all of that user's finalized courses
+    by_user: dict[int, list[Registration]] = {}
+    for reg in regs:
+        by_user.setdefault(reg.user_id, []).append(reg)
+    for user_regs in by_user.values():
+        _notify(
+            to=user_regs[0].user.email,
+            status_code="COURSE_REQUEST_FINAL",
+            extra={"course": ", ".join(r.course.name for r in user_regs)},
+        )
     return regs
 
 
 @transaction.atomic
-def set_status_rejected(reg: Registration, *, actor: User | None = None) -> Registration:
+def set_status_rejected(
+    reg: Registration, *, actor: User | None = None, now: datetime | None = None
+) -> Registration:
     if not reg.rejection_reason:
         raise CustomAPIException(
             code=EC.REG_REJECTION_REASON_REQUIRED,
             message="rejection_reason must be set before rejecting",
             status_code=status.HTTP_400_BAD_REQUEST,
         )
+    _load_relations(reg)
     reg.status = Registration.Status.REJECTED
-    reg.decided_at = timezone.now()
+    reg.decided_at = now or timezone.now()
     reg.save(update_fields=["status", "decided_at"])
-    send_status_change_email(
+    _notify(
         to=reg.user.email,
         status_code="COURSE_REQUEST_REJECTED",
         extra={"course": reg.course.name, "reason": reg.rejection_reason},
@@ -264,20 +489,101 @@ def set_status_rejected(reg: Registration, *, actor: User | None = None) -> Regi
     return reg
 
 
-def _auto_progress_to_payment(reg: Registration) -> None:
+# ---- bulk transitions (admin actions) ----
+# The status change is one UPDATE for the whole selection and the emails go out as one bulk job.
+
+def _lock_selection(queryset):
+    # rows another admin action is already working on are skipped, not waited for
+    return queryset.select_for_update(of=("self",), skip_locked=True)
+
+
+def bulk_set_status_approved(
+    queryset, *, actor: User | None = None, now: datetime | None = None
+) -> tuple[int, list[Registration], list[Registration]]:
+    """
+    Payment links are issued per registration before any lock is taken, so a gateway error
+    only fails its own row. A row is only approved if its status is still the one read here;
+    rows changed meanwhile (paid, rejected, another admin) or locked elsewhere are left alone.
+    Returns (approved count, registrations whose link failed, registrations skipped).
+    """
+    regs = list(queryset.exclude(status=Registration.Status.FINAL).select_related("course", "user"))
+    now = now or timezone.now()
+    issued, read_status, failed = {}, {}, []
+    for reg in regs:
+        try:
+            reg.payment_link = _issue_payment_link(reg)
+        except (CustomAPIException, requests.RequestException):
+            failed.append(reg)
+            continue
+        read_status[reg.pk] = reg.status
+        reg.status = Registration.Status.APPROVED
+        reg.decided_at = now
+        issued[reg.pk] = reg
+    if not issued:
+        return 0, failed, []
+
+    with transaction.atomic():
+        current = dict(_lock_selection(Registration.objects.filter(pk__in=issued)).values_list("pk", "status"))
+        approved, skipped = [], []
+        for pk, reg in issued.items():
+            if current.get(pk) == read_status[pk]:
+                approved.append(reg)
+            else:
+                reg.status = read_status[pk]
+                skipped.append(reg)
+        Registration.objects.bulk_update(approved, ["status", "payment_link", "decided_at"])
+
+        _notify_many([
+            (reg.user.email, "COURSE_REQUEST_APPROVED", {"course": reg.course.name, "payment_link": reg.payment_link}) for reg in approved
+        ])
+    return len(approved), failed, skipped
+
+
+@transaction.atomic
+def bulk_set_status_rejected(queryset, *, actor: User | None = None, now: datetime | None = None) -> int:
+    # rejecting requires a reason; rows without one are skipped in SQL
+    regs = list(_lock_selection(queryset.exclude(rejection_reason="").select_related("course", "user")))
+    if not regs:
+        return 0
+    Registration.objects.filter(id__in=[r.id for r in regs]).update(
+        status=Registration.Status.REJECTED, decided_at=now or timezone.now()
+    )
+
+    _notify_many([
+        (reg.user.email, "COURSE_REQUEST_REJECTED", {"course": reg.course.name, "reason": reg.rejection_reason}) for reg in regs
+    ])
+    return len(regs)
+
+
+@transaction.atomic
+def bulk_set_status_final(queryset, *, actor: User | None = None, now: datetime | None = None) -> int:
+    regs = list(_lock_selection(queryset.exclude(status=Registration.Status.FINAL).select_related("course", "user")))
+    if not regs:
+        return 0
+    Registration.objects.filter(id__in=[r.id for r in regs]).update(
+        status=Registration.Status.FINAL, decided_at=now or timezone.now()
+    )
+
+    _notify_many([
+        (reg.user.email, "COURSE_REQUEST_FINAL", {"course": reg.course.name}) for reg in regs
+    ])
+    return len(regs)
+
+
+def _auto_progress_to_payment(reg: Registration, *, now: datetime | None = None) -> None:
     total = _compute_total_amount(reg)
     if total <= 0:
         reg.status = Registration.Status.FINAL
-        reg.decided_at = timezone.now()
+        reg.decided_at = now or timezone.now()
         reg.payment_link = ""
         reg.save(update_fields=["status", "decided_at", "payment_link"])
-        send_status_change_email(
+        _notify(
             to=reg.user.email,
             status_code="COURSE_REQUEST_FINAL",
             extra={"course": reg.course.name},
         )
     else:
-        set_status_approved(reg, override_amount=total, description=_compose_description(reg))
+        set_status_approved(reg, override_amount=total, description=_compose_description(reg), now=now)
 
 def get_course_sessions(user: User, course: Course):
     if not _user_has_access_to_course(user, course):
@@ -286,43 +592,35 @@ def get_course_sessions(user: User, course: Course):
 
 
 def _user_has_access_to_course(user, course) -> bool:
-    return (
-        # direct child registration
-        Registration.objects.filter(
-            user=user,
-            status=Registration.Status.FINAL,
-            course=course,
-        ).exists()
-        or
+    return Registration.objects.filter(
+        user=user,
+        status=Registration.Status.FINAL,
+    ).filter(
+        # direct registration
+        Q(course=course)
         # selected as a child item under a finalized parent registration
-        Registration.objects.filter(
-            user=user,
-            status=Registration.Status.FINAL,
-            items__child_course=course,
-        ).exists()
-        or
+        | Q(items__child_course=course)
         # finalized to a parent (access to all children)
-        Registration.objects.filter(
-            user=user,
-            status=Registration.Status.FINAL,
-            course__children=course,
-        ).exists()
-    )
+        | Q(course__children=course)
+    ).exists()
 
 def _now_in_shift_window(course, *, window_minutes: int = 15, now: datetime | None = None) -> bool:
     if now is None:
         now = timezone.localtime()
 
     today_weekday = now.weekday()  # Monday=0
-    rules = course.schedule.filter(weekday=today_weekday)
+    # evaluated once; an empty list means no shift today
+    rules = list(course.schedule.filter(weekday=today_weekday).only("start_time", "end_time"))
 
-    if not rules.exists():
+    if not rules:
         return False
 
     # build datetimes for today using the course's schedule times
+    # (tzinfo is a zoneinfo zone, so attaching it directly is equivalent to make_aware)
+    today, tz = now.date(), now.tzinfo
     for rule in rules:
-        start_dt = timezone.make_aware(datetime.combine(now.date(), rule.start_time), now.tzinfo)
-        end_dt   = timezone.make_aware(datetime.combine(now.date(), rule.end_time),   now.tzinfo)
+        start_dt = datetime.combine(today, rule.start_time, tzinfo=tz)
+        end_dt   = datetime.combine(today, rule.end_time, tzinfo=tz)
 
         window_start = start_dt - timedelta(minutes=window_minutes)
         window_end   = end_dt + timedelta(minutes=window_minutes)
@@ -373,6 +671,6 @@ def get_skyroom_presentation_link(
             "ttl": ttl,
         },
     }
-    r = requests.post(url, json=payload, headers=HEADERS, timeout=20)
+    r = _http().post(url, json=payload, headers=HEADERS, timeout=20)
     r.raise_for_status()
     return r.json().get("result", None)
\ No newline at end of file
@@ -9,7 +9,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import Course, Registration
+from .models import Course, Registration, annotate_taken_seats
 from .serializers import (
     CourseSerializer,
     RegistrationCreateSerializer,
@@ -22,7 +22,7 @@ User = get_user_model()
 
 
 class CourseDetailView(generics.RetrieveAPIView):
-    queryset = Course.objects.filter(is_active=True).prefetch_related("presenters", "schedule")
+    queryset = CourseSerializer.setup_eager_loading(annotate_taken_seats(Course.objects.filter(is_active=True)))
     serializer_class = CourseSerializer
     lookup_field = "slug"
     permission_classes = []
@@ -40,7 +40,7 @@ class MyRegistrationsView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Registration.objects.filter(user=self.request.user).select_related("course")
+        return RegistrationSerializer.setup_eager_loading(Registration.objects.filter(user=self.request.user))
 
     @extend_schema(
         responses={200: RegistrationSerializer(many=True)},
@@ -74,6 +74,7 @@ class RegistrationCreateView(APIView):
                 child_ids=data.get("child_ids"),
                 extra_updates=data.get("extra_answers"),
             )
+            reg = RegistrationSerializer.setup_eager_loading(Registration.objects.filter(pk=reg.pk)).get()
             return Response(RegistrationSerializer(reg).data, status=status.HTTP_200_OK)
         except ValidationError as e:
             return Response({"error": str(e.message)}, status=status.HTTP_400_BAD_REQUEST)
@@ -96,10 +97,12 @@ class SkyroomLinkView(APIView):
         course_slug = request.query_params.get("course")
         course_id = request.query_params.get("course_id")
 
+        # create_skyroom_link only needs the pk (access check + today's schedule query)
+        courses = Course.objects.filter(is_active=True).only("id")
         if course_slug:
-            course = Course.objects.filter(slug=course_slug, is_active=True).first()
+            course = courses.filter(slug=course_slug).first()
         elif course_id:
-            course = Course.objects.filter(id=course_id, is_active=True).first()
+            course = courses.filter(id=course_id).first()
 
         if course is None:
             return Response({"detail": "Course not found."}, status=status.HTTP_400_BAD_REQUEST)